@@ -422,6 +422,11 @@ def resolve_image_full_path(index):
 
     return full_path
 
+@app.route('/api/session_total', methods=['GET'])
+def session_total():
+    """Return the number of images assigned to the current user session and the per-user cap."""
+    return jsonify({"total": len(get_user_images()), "cap": IMAGES_PER_USER})
+
 # Route to serve images with detailed debugging (from merged_images)
 @app.route('/images/<int:index>')
 def serve_image(index):
@@ -1,74 +1,275 @@
 import os
+import re
 import json
-import time
-from typing import List, Dict, Tuple
+import pickle
+import struct
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
 except ImportError:
     requests = None
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 from PIL import Image
 
 PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
 MERGED_ROOT = os.environ.get('MERGED_ROOT', os.path.join(PROJECT_ROOT, 'merged_images'))
 GF_ROOT = os.path.join(MERGED_ROOT, 'gazefollow')
 VAT_ROOT = os.path.join(MERGED_ROOT, 'vat')
+_GF_PREFIX = GF_ROOT + os.sep
 
 BASE_URL = os.environ.get('BASE_URL', 'http://127.0.0.1:5000')
+# Default 1: app.py's index reservation is not safe under concurrent POSTs (colliding
+# indices overwrite entries), and >1 worker also assigns indices out of image order
+POST_WORKERS = int(os.environ.get('POST_WORKERS', '1'))
+PREFETCH_WORKERS = int(os.environ.get('PREFETCH_WORKERS', '8'))
+HTTP_POOL_SIZE = 32
+MERGED_INDEX_CACHE_PATH = os.environ.get('MERGED_INDEX_CACHE_PATH', os.path.join(PROJECT_ROOT, 'merged_index.cache'))
+SIZE_CACHE_PATH = os.environ.get('SIZE_CACHE_PATH', os.path.join(PROJECT_ROOT, 'merged_image_sizes.json'))
+
+# Progress header on the label page, used when /api/session_total is unavailable
+_COUNT_RE = re.compile(rb"Image\s+1\s+of\s+(\d+)")
+_COUNT_SCAN_BYTES = 65536
+
+# os.fwalk is POSIX-only
+_HAVE_FWALK = hasattr(os, 'fwalk')
+
+# Full image path -> (width, height), persisted to SIZE_CACHE_PATH between runs
+_SIZE_CACHE: Dict[str, Tuple[int, int]] = {}
+
+# JPEG start-of-frame markers (SOF0-SOF15 minus DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Label tables for analyze_gaze/analyze_gaze_batch, indexed by integer codes
+_TARGET_TYPES = ('in-frame target', 'Eye-contact', 'out-of-frame target')
+_GAZE_POSITIONS = ('equal', 'farther', 'closer')
+_OBJECT_DETECTIONS = (
+    'Central object',
+    'Camera/Viewer',
+    'Object above (ceiling, sky, etc.)',
+    'Object below (floor, ground, etc.)',
+    'Object on left side',
+    'Object on right side',
+)
+# Object labels for non-eye-contact gazes, indexed by 3 * vert + horiz (0.3/0.7 bands)
+_OBJECT_GRID = (
+    _OBJECT_DETECTIONS[2], _OBJECT_DETECTIONS[2], _OBJECT_DETECTIONS[2],
+    _OBJECT_DETECTIONS[4], _OBJECT_DETECTIONS[0], _OBJECT_DETECTIONS[5],
+    _OBJECT_DETECTIONS[3], _OBJECT_DETECTIONS[3], _OBJECT_DETECTIONS[3],
+)
+# Focal point labels indexed by 9 * out_of_frame + 3 * vert + horiz
+_FOCAL_POINTS = (
+    'top-left', 'top', 'top-right',
+    'left', 'center', 'right',
+    'bottom-left', 'bottom', 'bottom-right',
+    'out-of-frame top-left', 'out-of-frame top', 'out-of-frame top-right',
+    'out-of-frame left', 'out-of-frame', 'out-of-frame right',
+    'out-of-frame bottom-left', 'out-of-frame bottom', 'out-of-frame bottom-right',
+)
+
+
+def _scan_dirs(root: str) -> Iterator[Tuple[str, List[str]]]:
+    """Yield (dirpath, filenames) under root via an explicit stack over os.scandir.
+    Matches os.walk: same top-down visiting order, symlinks to directories are
+    neither descended into nor listed as files, unreadable directories are skipped.
+    """
+    stack = [root]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        subdirs = []
+        files = []
+        with it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    files.append(entry.name)
+                elif not entry.is_symlink():
+                    subdirs.append(entry.path)
+        yield d, files
+        # Reversed so the first listed subdirectory is popped next, as os.walk recurses
+        stack.extend(reversed(subdirs))
+
+
+def _walk_dirs(root: str) -> Iterator[Tuple[str, List[str]]]:
+    """Yield (dirpath, filenames) under root.
+    Uses os.fwalk (directory fds, no per-entry path joins) where available,
+    i.e. on POSIX; falls back to _scan_dirs elsewhere (Windows) and when root
+    is itself a symlink, which os.fwalk would not follow (os.walk does).
+    """
+    if _HAVE_FWALK and not os.path.islink(root):
+        if os.path.isdir(root):
+            for dirpath, _, files, _ in os.fwalk(root):
+                yield dirpath, files
+    else:
+        yield from _scan_dirs(root)
 
 
-def collect_merged_sets() -> Tuple[set, set]:
+def _scan_gf() -> set:
     gf_rel_paths = set()
-    vat_basenames = set()
     try:
-        for root, dirs, files in os.walk(GF_ROOT):
-            for f in files:
-                rel = os.path.relpath(os.path.join(root, f), GF_ROOT)
-                gf_rel_paths.add(rel.replace(os.sep, '/'))
+        prefix_len = len(GF_ROOT) + 1
+        for dirpath, files in _walk_dirs(GF_ROOT):
+            rel_dir = dirpath[prefix_len:].replace(os.sep, '/')
+            prefix = rel_dir + '/' if rel_dir else ''
+            gf_rel_paths.update(prefix + f for f in files)
     except Exception as e:
         print(f"Warning: failed to scan merged GazeFollow: {e}")
+    return gf_rel_paths
+
+
+def _scan_vat() -> Tuple[set, Dict[str, str]]:
+    vat_basenames = set()
+    vat_index: Dict[str, str] = {}
     try:
-        for root, dirs, files in os.walk(VAT_ROOT):
+        for dirpath, files in _walk_dirs(VAT_ROOT):
+            vat_basenames.update(files)
             for f in files:
-                vat_basenames.add(f)
+                full_path = os.path.join(dirpath, f)
+                vat_index.setdefault(f, full_path)
+                vat_index.setdefault(os.path.splitext(f)[0], full_path)
     except Exception as e:
         print(f"Warning: failed to scan merged VAT: {e}")
-    return gf_rel_paths, vat_basenames
+    return vat_basenames, vat_index
+
+
+def _scan_merged_sets() -> Tuple[set, set, Dict[str, str]]:
+    # Directory listing releases the GIL, so the two trees are walked concurrently
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        gf_future = ex.submit(_scan_gf)
+        vat_future = ex.submit(_scan_vat)
+        gf_rel_paths = gf_future.result()
+        vat_basenames, vat_index = vat_future.result()
+    return gf_rel_paths, vat_basenames, vat_index
+
+
+def _merged_tree_signature() -> Tuple:
+    """mtimes of GF_ROOT/VAT_ROOT and their top-level subdirectories.
+    Changes deeper in the trees are not detected, hence the cache is opt-in.
+    """
+    sig = []
+    for root in (GF_ROOT, VAT_ROOT):
+        try:
+            sig.append((root, os.stat(root).st_mtime_ns))
+            with os.scandir(root) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        sig.append((entry.path, entry.stat(follow_symlinks=False).st_mtime_ns))
+        except OSError:
+            sig.append((root, None))
+    return tuple(sorted(sig, key=lambda s: s[0]))
+
+
+def _load_merged_index(sig: Tuple) -> Optional[Tuple[set, set, Dict[str, str]]]:
+    try:
+        with open(MERGED_INDEX_CACHE_PATH, 'rb') as f:
+            cached = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Warning: failed to load merged index cache {MERGED_INDEX_CACHE_PATH}: {e}")
+        return None
+    if not isinstance(cached, dict) or cached.get('sig') != sig:
+        return None
+    return cached['gf'], cached['vat'], cached['idx']
+
+
+def _save_merged_index(sig: Tuple, merged: Tuple[set, set, Dict[str, str]]) -> None:
+    """Atomically write the merged index cache (temp file + rename)."""
+    gf_rel_paths, vat_basenames, vat_index = merged
+    tmp_path = MERGED_INDEX_CACHE_PATH + '.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'sig': sig, 'gf': gf_rel_paths, 'vat': vat_basenames, 'idx': vat_index}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, MERGED_INDEX_CACHE_PATH)
+    except Exception as e:
+        print(f"Warning: failed to save merged index cache {MERGED_INDEX_CACHE_PATH}: {e}")
 
 
-def load_available_images() -> List[Dict]:
+def collect_merged_sets(use_cache: bool = False) -> Tuple[set, set, Dict[str, str]]:
+    """Return (gf_rel_paths, vat_basenames, vat_index).
+    With use_cache, reuse the on-disk index from a previous run when the merged
+    tree signature is unchanged, else rescan and rewrite it. Opt-in only: the
+    signature misses images added or removed below the top-level folders.
+    """
+    if not use_cache:
+        return _scan_merged_sets()
+    sig = _merged_tree_signature()
+    cached = _load_merged_index(sig)
+    if cached is not None:
+        return cached
+    merged = _scan_merged_sets()
+    _save_merged_index(sig, merged)
+    return merged
+
+
+def _iter_dataset(json_path: str) -> Iterator[Dict]:
+    """Yield entries of the combined dataset JSON.
+    Prefers orjson (fast C parser), then ijson (streams items so only the
+    ones kept by the caller are retained), then the stdlib json module.
+    """
+    with open(json_path, 'rb') as f:
+        if orjson is not None:
+            yield from orjson.loads(f.read())
+        elif ijson is not None:
+            yield from ijson.items(f, 'item', use_float=True)
+        else:
+            yield from json.load(f)
+
+
+def load_available_images(use_cache: bool = False) -> List[Dict]:
     json_path = os.path.join(PROJECT_ROOT, 'combined_gazefollow_vat.json')
+    gf_set, vat_set, vat_index = collect_merged_sets(use_cache)
+    available = []
     try:
-        with open(json_path, 'r') as f:
-            all_images = json.load(f)
+        for item in _iter_dataset(json_path):
+            p = item.get('path', '')
+            # Tag kept items with _is_gf/_basename/_full_path so later stages skip the string work
+            if isinstance(p, str) and p.startswith(('train/', 'test2/')):
+                if p in gf_set:
+                    item['_is_gf'] = True
+                    item['_basename'] = os.path.basename(p)
+                    item['_full_path'] = _GF_PREFIX + (p if os.sep == '/' else p.replace('/', os.sep))
+                    available.append(item)
+            else:
+                fname = os.path.basename(p)
+                if fname in vat_set:
+                    item['_is_gf'] = False
+                    item['_basename'] = fname
+                    item['_full_path'] = vat_index[fname]
+                    available.append(item)
     except Exception as e:
         print(f"Error loading {json_path}: {e}")
-        all_images = []
-    gf_set, vat_set = collect_merged_sets()
-    available = []
-    for item in all_images:
-        p = item.get('path', '')
-        if isinstance(p, str) and (p.startswith('train/') or p.startswith('test2/')):
-            if p in gf_set:
-                available.append(item)
-        else:
-            fname = os.path.basename(p)
-            if fname in vat_set:
-                available.append(item)
+        available = []
     print(f"Available merged images: {len(available)}")
     return available
 
 
-def find_image_file(base_dir: str, filename: str) -> str:
-    base_name = os.path.splitext(filename)[0]
-    for root, dirs, files in os.walk(base_dir):
-        for file in files:
-            if file == filename or os.path.splitext(file)[0] == base_name:
-                return os.path.join(root, file)
-    return None
-
-
 def rectify_bbox(x: float, y: float, w: float, h: float) -> Tuple[float, float, float, float]:
     if w is not None and h is not None:
         if w < 0:
@@ -83,6 +284,22 @@ def rectify_bbox(x: float, y: float, w: float, h: float) -> Tuple[float, float,
 def normalize_bbox(bbox: List[float], is_normalized: bool, width: int, height: int) -> List[float]:
     if not bbox or len(bbox) < 4:
         return [0.25, 0.25, 0.5, 0.5]
+    if is_normalized:
+        # GazeFollow fast path: floats already in [0,1] space, so skip casts and scaling
+        x, y, w, h = bbox[0], bbox[1], bbox[2], bbox[3]
+        if type(x) is float and type(y) is float and type(w) is float and type(h) is float:
+            if w < 0:
+                x += w
+                w = -w
+            if h < 0:
+                y += h
+                h = -h
+            return [
+                0.0 if x < 0.0 else 1.0 if x > 1.0 else x,
+                0.0 if y < 0.0 else 1.0 if y > 1.0 else y,
+                0.0 if w < 0.0 else 1.0 if w > 1.0 else w,
+                0.0 if h < 0.0 else 1.0 if h > 1.0 else h,
+            ]
     x, y, w, h = [float(v) for v in bbox[:4]]
     x, y, w, h = rectify_bbox(x, y, w, h)
     if not is_normalized:
@@ -96,7 +313,9 @@ def normalize_bbox(bbox: List[float], is_normalized: bool, width: int, height: i
 def normalize_point(pt: List[float], is_normalized: bool, width: int, height: int) -> List[float]:
     if not pt or len(pt) < 2:
         return [0.5, 0.5]
-    px, py = pt[:2]
+    px, py = pt[0], pt[1]
+    if is_normalized and type(px) is float and type(py) is float:
+        return [px, py]
     try:
         px = float(px)
         py = float(py)
@@ -118,67 +337,41 @@ def analyze_gaze(bbox: List[float], gaze: List[float], width: int, height: int)
     faceY = by * height
     faceW = bw * width
     faceH = bh * height
+    faceCenterX = faceX + faceW / 2
+    faceCenterY = faceY + faceH / 2
+    gazeDistance = ((gazeX - faceCenterX) ** 2 + (gazeY - faceCenterY) ** 2) ** 0.5
     # Target type
     if gazeX < 0 or gazeX > width or gazeY < 0 or gazeY > height:
         targetType = 'out-of-frame target'
+    elif gazeDistance < min(faceW, faceH) * 0.3:
+        targetType = 'Eye-contact'
     else:
-        faceCenterX = faceX + faceW / 2
-        faceCenterY = faceY + faceH / 2
-        gazeDistance = ((gazeX - faceCenterX) ** 2 + (gazeY - faceCenterY) ** 2) ** 0.5
-        if gazeDistance < min(faceW, faceH) * 0.3:
-            targetType = 'Eye-contact'
-        else:
-            targetType = 'in-frame target'
+        targetType = 'in-frame target'
     # Farther/closer/equal
-    gazeDistanceFromFace = ((gazeX - (faceX + faceW/2)) ** 2 + (gazeY - (faceY + faceH/2)) ** 2) ** 0.5
     faceSize = (faceW * faceH) ** 0.5
-    if gazeDistanceFromFace > faceSize * 2:
+    if gazeDistance > faceSize * 2:
         gazePosition = 'farther'
-    elif gazeDistanceFromFace < faceSize * 0.5:
+    elif gazeDistance < faceSize * 0.5:
         gazePosition = 'closer'
     else:
         gazePosition = 'equal'
     # Scale estimate in meters
+    if faceW == 0:
+        raise ZeroDivisionError("face bbox has zero width; cannot estimate gaze scale")
     estimatedFaceWidthMeters = 0.2
     pixelsPerMeter = faceW / estimatedFaceWidthMeters if estimatedFaceWidthMeters > 0 else 1.0
-    gazeDistanceMeters = gazeDistanceFromFace / pixelsPerMeter
+    gazeDistanceMeters = gazeDistance / pixelsPerMeter
     scale = f"{gazeDistanceMeters:.2f}"
-    # Object detection heuristic
+    # Object detection heuristic (vertical bands take priority over horizontal)
     if targetType == 'Eye-contact':
         objectDetection = 'Camera/Viewer'
-    elif gy < 0.3:
-        objectDetection = 'Object above (ceiling, sky, etc.)'
-    elif gy > 0.7:
-        objectDetection = 'Object below (floor, ground, etc.)'
-    elif gx < 0.3:
-        objectDetection = 'Object on left side'
-    elif gx > 0.7:
-        objectDetection = 'Object on right side'
     else:
-        objectDetection = 'Central object'
-    # Focal point (region) classification
+        objectDetection = _OBJECT_GRID[3 * ((gy >= 0.3) + (gy > 0.7)) + (gx >= 0.3) + (gx > 0.7)]
+    # Focal point (region) classification: 3x3 grid in frame, frame edges out of frame
     if gx < 0 or gx > 1 or gy < 0 or gy > 1:
-        horiz = 'left' if gx < 0 else ('right' if gx > 1 else 'center')
-        vert = 'top' if gy < 0 else ('bottom' if gy > 1 else 'middle')
-        if horiz == 'center' and vert == 'middle':
-            focal = 'out-of-frame'
-        elif vert == 'middle':
-            focal = f'out-of-frame {horiz}'
-        elif horiz == 'center':
-            focal = f'out-of-frame {vert}'
-        else:
-            focal = f'out-of-frame {vert}-{horiz}'
+        focal = _FOCAL_POINTS[9 + 3 * ((gy >= 0) + (gy > 1)) + (gx >= 0) + (gx > 1)]
     else:
-        horiz = 'left' if gx < 0.3333 else ('right' if gx > 0.6667 else 'center')
-        vert = 'top' if gy < 0.3333 else ('bottom' if gy > 0.6667 else 'middle')
-        if horiz == 'center' and vert == 'middle':
-            focal = 'center'
-        elif vert == 'middle':
-            focal = horiz
-        elif horiz == 'center':
-            focal = vert
-        else:
-            focal = f'{vert}-{horiz}'
+        focal = _FOCAL_POINTS[3 * ((gy >= 0.3333) + (gy > 0.6667)) + (gx >= 0.3333) + (gx > 0.6667)]
     return {
         'target_type': targetType,
         'farther_closer': gazePosition,
@@ -188,49 +381,158 @@ def analyze_gaze(bbox: List[float], gaze: List[float], width: int, height: int)
     }
 
 
+def analyze_gaze_batch(bboxes: 'np.ndarray', gazes: 'np.ndarray', sizes: 'np.ndarray') -> List[Dict[str, str]]:
+    """Vectorized analyze_gaze over N rows.
+    bboxes is (N, 4), gazes is (N, 2) and sizes is (N, 2) as (width, height).
+    """
+    bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+    gazes = np.asarray(gazes, dtype=float).reshape(-1, 2)
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 2)
+    width, height = sizes[:, 0], sizes[:, 1]
+    gx, gy = gazes[:, 0], gazes[:, 1]
+    gazeX = gx * width
+    gazeY = gy * height
+    faceW = bboxes[:, 2] * width
+    faceH = bboxes[:, 3] * height
+    faceCenterX = bboxes[:, 0] * width + faceW / 2
+    faceCenterY = bboxes[:, 1] * height + faceH / 2
+    gazeDistance = np.sqrt((gazeX - faceCenterX) ** 2 + (gazeY - faceCenterY) ** 2)
+    # Target type
+    out_of_frame = (gazeX < 0) | (gazeX > width) | (gazeY < 0) | (gazeY > height)
+    eye_contact = ~out_of_frame & (gazeDistance < np.minimum(faceW, faceH) * 0.3)
+    target = np.where(out_of_frame, 2, eye_contact.astype(int))
+    # Farther/closer/equal
+    faceSize = np.sqrt(faceW * faceH)
+    position = np.select([gazeDistance > faceSize * 2, gazeDistance < faceSize * 0.5], [1, 2], default=0)
+    # Scale estimate in meters (0.2m face width); zero-width faces raise like analyze_gaze
+    zero_width = np.flatnonzero(faceW == 0)
+    if zero_width.size:
+        raise ZeroDivisionError(f"face bbox has zero width at row {zero_width[0]} ({zero_width.size} row(s) total); cannot estimate gaze scale")
+    gazeDistanceMeters = gazeDistance / (faceW / 0.2)
+    # Object detection heuristic
+    obj = np.select([eye_contact, gy < 0.3, gy > 0.7, gx < 0.3, gx > 0.7], [1, 2, 3, 4, 5], default=0)
+    # Focal point: 3x3 grid in frame, frame edges out of frame
+    frame_oof = (gx < 0) | (gx > 1) | (gy < 0) | (gy > 1)
+    lo = np.where(frame_oof, 0.0, 0.3333)
+    hi = np.where(frame_oof, 1.0, 0.6667)
+    horiz = np.where(gx < lo, 0, np.where(gx > hi, 2, 1))
+    vert = np.where(gy < lo, 0, np.where(gy > hi, 2, 1))
+    focal = 9 * frame_oof + 3 * vert + horiz
+    return [
+        {
+            'target_type': _TARGET_TYPES[t],
+            'farther_closer': _GAZE_POSITIONS[p],
+            'scale': f"{m:.2f}",
+            'object_detection': _OBJECT_DETECTIONS[o],
+            'focal_point': _FOCAL_POINTS[f],
+        }
+        for t, p, m, o, f in zip(target.tolist(), position.tolist(), gazeDistanceMeters.tolist(), obj.tolist(), focal.tolist())
+    ]
+
+
+def load_size_cache() -> None:
+    try:
+        with open(SIZE_CACHE_PATH, 'r') as f:
+            data = json.load(f)
+        for path, (width, height) in data.items():
+            _SIZE_CACHE[path] = (int(width), int(height))
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Warning: failed to load size cache {SIZE_CACHE_PATH}: {e}")
+
+
+def save_size_cache() -> None:
+    """Atomically write the size cache (temp file + rename)."""
+    tmp_path = SIZE_CACHE_PATH + '.tmp'
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(_SIZE_CACHE, f)
+        os.replace(tmp_path, SIZE_CACHE_PATH)
+    except Exception as e:
+        print(f"Warning: failed to save size cache {SIZE_CACHE_PATH}: {e}")
+
+
+def _jpeg_size(path: str) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a JPEG's SOFn segment without going through PIL.
+    Returns None if the file is not a JPEG or no usable frame header is found.
+    """
+    with open(path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+        while True:
+            b = f.read(1)
+            while b and b != b'\xff':
+                b = f.read(1)
+            while b == b'\xff':  # fill bytes
+                b = f.read(1)
+            if not b:
+                return None
+            marker = b[0]
+            if marker in (0xD9, 0xDA):  # EOI / SOS before any frame header
+                return None
+            if 0xD0 <= marker <= 0xD7 or marker == 0x01:  # standalone markers
+                continue
+            header = f.read(2)
+            if len(header) < 2:
+                return None
+            (seg_len,) = struct.unpack('>H', header)
+            if marker in _JPEG_SOF_MARKERS:
+                frame = f.read(5)
+                if len(frame) < 5:
+                    return None
+                _, height, width = struct.unpack('>BHH', frame)
+                return (width, height) if width and height else None
+            f.seek(seg_len - 2, os.SEEK_CUR)
+
+
+def _read_image_size(path: str) -> Tuple[int, int]:
+    if path.lower().endswith(('.jpg', '.jpeg')):
+        size = _jpeg_size(path)
+        if size is not None:
+            return size
+    with Image.open(path) as img:
+        return img.size
+
+
 def resolve_image_full_path(item: Dict) -> Tuple[str, int, int]:
-    filename = os.path.basename(item['path'])
-    if item['path'].startswith('test2/') or item['path'].startswith('train/'):
-        full_path = os.path.join(GF_ROOT, item['path'].replace('/', os.sep))
-    else:
-        full_path = find_image_file(VAT_ROOT, filename) or find_image_file(VAT_ROOT, os.path.splitext(filename)[0] + '.jpg')
+    """Return (full_path, width, height) for an item tagged by load_available_images."""
+    full_path = item.get('_full_path')
     if not full_path or not os.path.exists(full_path):
-        raise FileNotFoundError(f"Image not found in merged set: {filename}")
-    with Image.open(full_path) as img:
-        width, height = img.size
+        raise FileNotFoundError(f"Image not found in merged set: {item.get('_basename')}")
+    size = _SIZE_CACHE.get(full_path)
+    if size is None:
+        size = _read_image_size(full_path)
+        _SIZE_CACHE[full_path] = size
+    width, height = size
     return full_path, width, height
 
 
-def build_annotations(item: Dict) -> List[Dict]:
-    """Build one or more annotations for an image.
+def prefetch_image_sizes(items: List[Dict]) -> None:
+    """Resolve every item's image path and size up front in a thread pool.
+    Stores (full_path, width, height) as item['_resolved'], so building
+    annotations afterwards does no file I/O.
+    """
+    with ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as ex:
+        for item, resolved in zip(items, ex.map(resolve_image_full_path, items)):
+            item['_resolved'] = resolved
+
+
+def _annotation_gazes(item: Dict) -> Tuple[List[float], List[List[float]], int, int]:
+    """Resolve an image and collect the gazes to annotate for it.
     - Primary: dataset-provided gaze (normalized)
     - Secondary (if available and distinct): eye-contact gaze using the eye position
     - Future: if item contains a 'gazes' list, include them all
+    Returns (bbox, gazes, width, height).
     """
-    full_path, width, height = resolve_image_full_path(item)
-    p = item.get('path', '')
-    is_gf = isinstance(p, str) and (p.startswith('train/') or p.startswith('test2/'))
+    full_path, width, height = item.get('_resolved') or resolve_image_full_path(item)
+    is_gf = item['_is_gf']
     bbox = normalize_bbox(item.get('bbox'), is_gf, width, height)
     eye = normalize_point(item.get('eye'), is_gf, width, height)
     gaze = normalize_point(item.get('gaze') or eye, is_gf, width, height)
 
-    anns: List[Dict] = []
-
-    # Helper to create an annotation dict for a given gaze
-    def make_ann(g: List[float]) -> Dict:
-        analysis = analyze_gaze(bbox, g, width, height)
-        return {
-            'bbox': bbox,
-            'gaze': g,
-            'target_type': analysis['target_type'],
-            'farther_closer': analysis['farther_closer'],
-            'scale': analysis['scale'],
-            'object_detection': analysis['object_detection'],
-            'focal_point': analysis['focal_point'],
-        }
-
     # 1) Primary annotation from dataset's gaze
-    anns.append(make_ann(gaze))
+    gazes = [gaze]
 
     # 2) Secondary: eye-contact annotation if distinct enough from primary
     try:
@@ -240,62 +542,166 @@ def build_annotations(item: Dict) -> List[Dict]:
     except Exception:
         dist = 0.0
     if dist > 0.05:  # normalized distance threshold
-        anns.append(make_ann(eye))
+        gazes.append(eye)
 
     # 3) If item contains explicit multiple gazes
-    gazes = item.get('gazes')
-    if isinstance(gazes, list):
-        for g in gazes:
-            gp = normalize_point(g, is_gf, width, height)
-            anns.append(make_ann(gp))
+    extra = item.get('gazes')
+    if isinstance(extra, list):
+        for g in extra:
+            gazes.append(normalize_point(g, is_gf, width, height))
 
-    # Assign gaze_number sequentially
-    for i, ann in enumerate(anns, start=1):
-        ann['gaze_number'] = i
+    return bbox, gazes, width, height
 
-    return anns
+
+def _assemble_annotations(bbox: List[float], gazes: List[List[float]], analyses: Iterable[Dict[str, str]]) -> List[Dict]:
+    """Emit one annotation dict per gaze, numbering gazes from 1.
+    analyses may be a shared iterator; exactly len(gazes) entries are consumed.
+    """
+    return [
+        {'bbox': bbox, 'gaze': g, **analysis, 'gaze_number': i}
+        for i, (g, analysis) in enumerate(zip(gazes, analyses), start=1)
+    ]
+
+
+def build_annotations(item: Dict) -> List[Dict]:
+    """Build one or more annotations for an image (see _annotation_gazes)."""
+    bbox, gazes, width, height = _annotation_gazes(item)
+    analyses = [analyze_gaze(bbox, g, width, height) for g in gazes]
+    return _assemble_annotations(bbox, gazes, analyses)
+
+
+def build_annotations_batch(items: List[Dict]) -> List[List[Dict]]:
+    """Build annotations for many images, analyzing all gazes in one NumPy pass.
+    Falls back to per-item build_annotations when NumPy is not installed.
+    """
+    if np is None:
+        return [build_annotations(item) for item in items]
+    inputs = [_annotation_gazes(item) for item in items]
+    bboxes, gazes, sizes = [], [], []
+    for bbox, item_gazes, width, height in inputs:
+        for g in item_gazes:
+            bboxes.append(bbox)
+            gazes.append(g)
+            sizes.append((width, height))
+    analyses = iter(analyze_gaze_batch(np.array(bboxes, dtype=float), np.array(gazes, dtype=float), np.array(sizes, dtype=float)))
+    return [_assemble_annotations(bbox, item_gazes, analyses) for bbox, item_gazes, _, _ in inputs]
+
+
+def _dumps_annotations(anns: List[Dict]) -> str:
+    """Serialize annotations for the form field, with orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(anns).decode()
+    return json.dumps(anns)
+
+
+# Per-thread requests.Session for the POST pool (sessions are not thread-safe)
+_thread_local = threading.local()
+
+
+def _new_session() -> 'requests.Session':
+    """Session with a larger keep-alive connection pool and no retries."""
+    sess = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+    sess.mount('http://', adapter)
+    sess.mount('https://', adapter)
+    sess.headers.update({'Connection': 'keep-alive', 'Accept-Encoding': 'gzip'})
+    return sess
+
+
+def _worker_session(cookies) -> 'requests.Session':
+    sess = getattr(_thread_local, 'session', None)
+    if sess is None:
+        sess = _new_session()
+        sess.cookies.update(cookies)
+        _thread_local.session = sess
+    return sess
+
+
+def _post_annotations(idx: int, body: str, cookies) -> 'requests.Response':
+    sess = _worker_session(cookies)
+    # The app answers a successful POST with a redirect to the next page; don't fetch it
+    return sess.post(f"{BASE_URL}/label_image/{idx}", data={'annotations': body}, allow_redirects=False)
 
 
 def main():
-    available = load_available_images()
+    parser = argparse.ArgumentParser(description='Auto-annotate merged images via the running labeling app.')
+    parser.add_argument('--index-cache', action='store_true', help='reuse the merged index from the last run if the top-level folder mtimes match (deeper changes are not detected)')
+    parser.add_argument('--no-cache', action='store_true', help='ignore the on-disk image size cache (it is rebuilt)')
+    args = parser.parse_args()
+    available = load_available_images(args.index_cache)
     if not available:
         print("No available merged images. Ensure merged_images is populated and combined_gazefollow_vat.json is valid.")
         return
     if requests is None:
         print("The 'requests' package is required. Please install it: pip install requests")
         return
-    sess = requests.Session()
+    sess = _new_session()
     # Initialize session (sets cookie) and discover user session image count
-    r = sess.get(f"{BASE_URL}/")
+    r = sess.get(f"{BASE_URL}/", allow_redirects=False)
     if r.status_code not in (200, 302):
         print(f"Failed to initialize session: HTTP {r.status_code}")
         return
-    # Load first label page to parse session count
-    page = sess.get(f"{BASE_URL}/label_image/0")
     session_total = None
-    if page.status_code == 200:
+    session_cap = None
+    resp = sess.get(f"{BASE_URL}/api/session_total")
+    if resp.status_code == 200:
         try:
-            import re
-            m = re.search(r"Image\s+1\s+of\s+(\d+)", page.text)
-            if m:
-                session_total = int(m.group(1))
+            body = resp.json()
+            session_total = int(body['total'])
+            session_cap = int(body['cap']) if body.get('cap') is not None else None
         except Exception:
             session_total = None
+    if session_total is None:
+        # Older app versions: parse the count from the first label page header
+        page = sess.get(f"{BASE_URL}/label_image/0")
+        if page.status_code == 200:
+            try:
+                m = _COUNT_RE.search(page.content, 0, _COUNT_SCAN_BYTES)
+                if m:
+                    session_total = int(m.group(1))
+            except Exception:
+                session_total = None
     if session_total is None:
         # Fallback: cap at 500 like the app
         session_total = 500
+    elif session_cap is not None and min(len(available), session_cap) != session_total:
+        # POSTs are matched to the app's images by index only, so differing lists would misfile annotations
+        print(f"Merged image list differs from the app's: found {len(available)} image(s), app serves {session_total}.")
+        if args.index_cache:
+            print("The merged index cache may be stale; rerun without --index-cache.")
+        else:
+            print("Restart the app so it rescans merged_images, then rerun.")
+        return
     total = min(len(available), session_total)
     print(f"Auto-annotating {total} images via {BASE_URL}...")
-    for idx, item in enumerate(available[:total]):
-        anns = build_annotations(item)
-        payload = {'annotations': json.dumps(anns)}
-        resp = sess.post(f"{BASE_URL}/label_image/{idx}", data=payload)
-        if resp.status_code not in (200, 302):
-            print(f"[#{idx}] POST failed: HTTP {resp.status_code} - {resp.text[:200]}")
-            break
-        else:
-            print(f"[#{idx+1}/{total}] Saved {len(anns)} annotation(s) for {item.get('path')}")
-        time.sleep(0.02)  # gentle pacing
+    items = available[:total]
+    if not args.no_cache:
+        load_size_cache()
+    try:
+        prefetch_image_sizes(items)
+        all_anns = build_annotations_batch(items)
+    finally:
+        save_size_cache()
+    payloads = [(idx, _dumps_annotations(anns)) for idx, anns in enumerate(all_anns)]
+    with ThreadPoolExecutor(max_workers=POST_WORKERS) as ex:
+        futures = {ex.submit(_post_annotations, idx, body, sess.cookies): idx for idx, body in payloads}
+        saved = 0
+        for fut in as_completed(futures):
+            idx = futures[fut]
+            try:
+                resp = fut.result()
+            except requests.RequestException as e:
+                print(f"[#{idx}] POST failed: {e}")
+                resp = None
+            if resp is None or resp.status_code not in (200, 302):
+                if resp is not None:
+                    print(f"[#{idx}] POST failed: HTTP {resp.status_code} - {resp.text[:200]}")
+                # Stop at the first failure: drop queued POSTs instead of sending them on shutdown
+                for pending in futures:
+                    pending.cancel()
+                break
+            saved += 1
+            print(f"[#{saved}/{total}] Saved {len(all_anns[idx])} annotation(s) for {items[idx].get('path')}")
     print("Done. Annotations saved to annotations.json by the app.")
 
 